@@ -0,0 +1,183 @@
+"""
+Summarises validation diagnostics in bounded memory instead of printing one line per finding.
+
+Diagnostics are grouped by the check that reported them and a message template, which is the message
+with the addresses, quoted words and phrases, lists and numbers taken out.
+For each group the summary keeps
+* the count,
+* the most frequent lemmata, UPOS and documents, with the Space-Saving algorithm
+  (Metwally, Agrawal and El Abbadi 2005), and
+* a reservoir sample of sent_ids.
+The groups themselves are also kept with Space-Saving, so memory does not grow with the input however
+many distinct messages there are. Counts that may be overestimates because of this are shown with ~.
+The error and warning totals and the PASSED/FAILED line are counted exactly, as before.
+
+Usage:
+    python validate_gd_extras.py --summary silver.conllu.gz
+"""
+import random
+import re
+from collections import Counter
+
+TEMPLATE_PATTERNS = [
+    (re.compile(r"\S+#\d+(?:\.\d+)?"), "#"),
+    # A quoted word starts after a space or bracket and ends at the first quote followed by a space,
+    # punctuation or the end, so that apostrophes in words like 's, b'e and a' stay inside it.
+    (re.compile(r"(?<![^\s(\[])'\S*?'(?=[\s:,;)\]]|$)"), "'*'"),
+    (re.compile(r"\[[^\]]*\]"), "[*]"),
+    (re.compile(r"\([^)]*\)"), "(*)"),
+    (re.compile(r"\b\d+\b"), "N"),
+]
+
+def template(line, phrases=()) -> str:
+    """
+    Returns the message of a diagnostic line without its code and address and with its variable parts
+    replaced, so that "E c01_002#3 'leam' is a MWE..." and "E s06_001#7 'rium' is a MWE..." come out the same.
+
+    Quoted phrases of more than one word cannot be told apart from the rest of the message,
+    so they are replaced only if they are passed in.
+    """
+    parts = line.split(" ", 2)
+    message = parts[2] if len(parts) == 3 else line
+    for phrase in phrases:
+        message = message.replace(f"'{phrase}'", "'*'")
+    for pattern, replacement in TEMPLATE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return message
+
+class SpaceSaving:
+    """
+    Approximate counts of the most frequent keys in at most capacity counters.
+
+    When a new key arrives and there is no room, the key with the lowest count is replaced and the new key
+    inherits that count as its possible overestimate. Keys that are frequent enough are never evicted.
+    An optional factory makes a value to go with each key, which is thrown away with it.
+    """
+    def __init__(self, capacity, factory=None):
+        self.capacity = capacity
+        self.factory = factory
+        self.counts = {}
+        self.errors = {}
+        self.values = {}
+
+    def add(self, key, count=1):
+        """
+        Counts a key and returns its value.
+        """
+        if key not in self.counts:
+            error = 0
+            if len(self.counts) >= self.capacity:
+                smallest = min(self.counts, key=self.counts.get)
+                error = self.counts.pop(smallest)
+                self.errors.pop(smallest)
+                self.values.pop(smallest, None)
+            self.counts[key] = error
+            self.errors[key] = error
+            if self.factory is not None:
+                self.values[key] = self.factory()
+        self.counts[key] += count
+        return self.values.get(key)
+
+    def most_common(self, n=None) -> list:
+        """
+        Returns (key, count, possible overestimate) tuples, highest count first.
+        """
+        keys = sorted(self.counts, key=lambda k: (-self.counts[k], str(k)))[:n]
+        return [(k, self.counts[k], self.errors[k]) for k in keys]
+
+class Reservoir:
+    """
+    A uniform random sample of at most size items from a stream (Vitter's algorithm R).
+    """
+    def __init__(self, size, generator):
+        self.size = size
+        self.generator = generator
+        self.seen = 0
+        self.items = []
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            i = self.generator.randrange(self.seen)
+            if i < self.size:
+                self.items[i] = item
+
+class Aggregator:
+    """
+    Collects diagnostics into the summary described at the top of this module.
+    """
+    def __init__(self, buckets=200, top=5, samples=5, seed=1):
+        self.top = top
+        self.samples = samples
+        self.generator = random.Random(seed)
+        self.codes = Counter()
+        self.rules = Counter()
+        self.buckets = SpaceSaving(buckets, self._bucket)
+        self.total_errors = 0
+        self.total_warnings = 0
+        self.sentences = 0
+        self.document = ""
+
+    def _bucket(self) -> dict:
+        return {
+            "lemma": SpaceSaving(self.top * 10),
+            "upos": SpaceSaving(self.top * 10),
+            "document": SpaceSaving(self.top * 10),
+            "sent_id": Reservoir(self.samples, self.generator),
+        }
+
+    def add_sentence(self, root, diagnostics, errors, warnings):
+        """
+        Adds the diagnostics collected for one sentence and its exact error and warning counts.
+        """
+        self.sentences += 1
+        self.total_errors += errors
+        self.total_warnings += warnings
+        if root.newdoc and root.newdoc is not True:
+            self.document = root.newdoc
+        for diagnostic in diagnostics:
+            code = diagnostic.line.split(" ", 1)[0]
+            self.codes[code] += 1
+            self.rules[(code, diagnostic.rule)] += 1
+            bucket = self.buckets.add((code, diagnostic.rule, template(diagnostic.line, diagnostic.phrases)))
+            node = diagnostic.node
+            if node is not None and not node.is_root():
+                bucket["lemma"].add(node.lemma)
+                bucket["upos"].add(node.upos)
+            bucket["document"].add(self.document)
+            bucket["sent_id"].add(root.sent_id)
+
+    def report(self) -> str:
+        """
+        Returns the summary as text, most frequent groups first.
+        """
+        lines = [f"*** SUMMARY *** of {self.sentences} sentence{'s' if self.sentences != 1 else ''}, "
+                 + (", ".join(f"{count} {code}" for code, count in sorted(self.codes.items())) or "no")
+                 + " diagnostic lines"]
+        for (code, rule), count in sorted(self.rules.items(), key=lambda r: (-r[1], r[0])):
+            lines.append(f"{code} {rule} {count}")
+        for (code, rule, message), count, error in self.buckets.most_common():
+            bucket = self.buckets.values[(code, rule, message)]
+            lines.append(f"  {'~' if error else ''}{count} {code} {rule}: {message}")
+            for dimension in ["lemma", "upos", "document"]:
+                top = bucket[dimension].most_common(self.top)
+                if top:
+                    lines.append(f"      {dimension}: "
+                                 + ", ".join(f"{key} {'~' if e else ''}{c}" for key, c, e in top))
+            lines.append(f"      e.g. {' '.join(sorted(bucket['sent_id'].items))}")
+        return "\n".join(lines)
+
+def summarise_trees(trees, allowed_fixed, aggregator=None) -> Aggregator:
+    """
+    Runs all the checks over each udapi tree from an iterable with diagnostics collected into an Aggregator.
+    """
+    from validate_gd_extras import collecting, speech_lemmata, validate_tree
+    if aggregator is None:
+        aggregator = Aggregator()
+    for root in trees:
+        with collecting() as diagnostics:
+            errors, warnings = validate_tree(root, allowed_fixed, speech_lemmata)
+        aggregator.add_sentence(root, diagnostics, errors, warnings)
+    return aggregator
@@ -0,0 +1,202 @@
+"""
+Single entry point for the treebank tools.
+
+    python arcosg.py validate gd_arcosg-ud-dev.conllu
+    python arcosg.py migrate 2.17 in.conllu.gz out.conllu.gz --workers 4
+    python arcosg.py stats gd_arcosg-ud-dev.conllu gd_arcosg-ud-test.conllu
+    python arcosg.py query gd_arcosg-ud-dev.conllu --where lemma=bi --where deprel=obj
+    python arcosg.py duplicates gd_arcosg-ud-train.conllu gd_arcosg-ud-dev.conllu
+    python arcosg.py autofix gd_arcosg-ud-dev.conllu --output fixed.conllu
+
+Only argparse is imported at startup.
+udapi, the checks and the lexicons are imported by the subcommands that need them,
+so calling this from a pre-commit hook does not pay for what it does not use.
+--time reports the startup and run times on stderr; `python -X importtime` gives the detail.
+validate and migrate read and write .gz, .bz2, .xz and .zst files and stream them a sentence at a time,
+see pipeline.py.
+"""
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import sys
+
+COLUMNS = ["id", "form", "lemma", "upos", "xpos", "feats", "head", "deprel", "deps", "misc"]
+MIGRATIONS = {"2.16": "update_ud2_16", "2.17": "update_ud2_17"}
+
+def validate(args) -> int:
+    """
+    Validates each file and prints a verdict for each.
+
+    Returns 1 if any file failed.
+    """
+    import validate_gd_extras
+    from pipeline import read_trees
+    allowed_fixed = validate_gd_extras.read_fixed()
+    status = 0
+    for filename in args.files:
+        if len(args.files) > 1:
+            print(f"# {filename}")
+        trees = read_trees(filename)
+        if args.summary:
+            import aggregate
+            aggregator = aggregate.summarise_trees(trees, allowed_fixed)
+            print(aggregator.report())
+            total_errors, total_warnings = aggregator.total_errors, aggregator.total_warnings
+        else:
+            total_errors, total_warnings = validate_gd_extras.validate_trees(trees, allowed_fixed)
+        validate_gd_extras.print_verdict(total_errors, total_warnings)
+        if total_errors != 0:
+            status = 1
+    return status
+
+def migrate(args) -> int:
+    """
+    Applies the updates for a release to a file, reading, updating and writing at the same time.
+    """
+    import importlib
+    from pipeline import run_pipeline
+    module = importlib.import_module(MIGRATIONS[args.release])
+    run_pipeline(args.input, module.update_tree, args.output, workers=args.workers)
+    return 0
+
+def stats(args) -> int:
+    """
+    Prints sentence, token, word and document counts for each file,
+    and optionally counts of the values of one column.
+
+    Works on the columns directly so no trees are built.
+    """
+    from collections import Counter
+    from snapshot import iter_sentences
+    column = COLUMNS.index(args.by) if args.by is not None else None
+    print("file\tdocuments\tsentences\ttokens\twords")
+    for filename in args.files:
+        documents = sentences = tokens = words = 0
+        values = Counter()
+        for comments, fields_list in iter_sentences(filename):
+            sentences += 1
+            if any(c.startswith("# newdoc") for c in comments):
+                documents += 1
+            covered = 0
+            for fields in fields_list:
+                token_id = fields[0]
+                if "-" in token_id:
+                    tokens += 1
+                    start, end = token_id.split("-")
+                    covered = int(end)
+                elif "." not in token_id:
+                    words += 1
+                    if int(token_id) > covered:
+                        tokens += 1
+                    if column is not None:
+                        values[fields[column]] += 1
+        print(f"{filename}\t{documents}\t{sentences}\t{tokens}\t{words}")
+        for value, count in values.most_common():
+            print(f"\t{value}\t{count}")
+    return 0
+
+def parse_condition(condition):
+    """
+    Splits COLUMN=VALUE or COLUMN.KEY=VALUE (for feats and misc) into (column index, key, value).
+    """
+    name, _, value = condition.partition("=")
+    name, _, key = name.partition(".")
+    if name not in COLUMNS:
+        raise argparse.ArgumentTypeError(f"unknown column {name}, should be one of {', '.join(COLUMNS)}")
+    if key and name not in ["feats", "misc"]:
+        raise argparse.ArgumentTypeError(f"only feats and misc have keys, not {name}")
+    return COLUMNS.index(name), key, value
+
+def matches(fields, conditions) -> bool:
+    for column, key, value in conditions:
+        if key:
+            pairs = dict(p.split("=", 1) for p in fields[column].split("|") if "=" in p)
+            if pairs.get(key) != value:
+                return False
+        elif fields[column] != value:
+            return False
+    return True
+
+def query(args) -> int:
+    """
+    Prints the address and main columns of every word matching all the conditions.
+
+    Returns 1 if nothing matched, like grep.
+    """
+    from snapshot import iter_sentences
+    found = 0
+    for filename in args.files:
+        for comments, fields_list in iter_sentences(filename):
+            sent_id = next((c[len("# sent_id = "):] for c in comments if c.startswith("# sent_id = ")), "")
+            for fields in fields_list:
+                if "-" in fields[0] or "." in fields[0]:
+                    continue
+                if matches(fields, args.where):
+                    found += 1
+                    print(f"{sent_id}#{fields[0]}\t{fields[1]}\t{fields[2]}\t{fields[3]}\t{fields[7]}")
+    return 0 if found else 1
+
+def duplicates(args) -> int:
+    import find_duplicates
+    find_duplicates.main(args.arguments)
+    return 0
+
+def autofix(args) -> int:
+    import autofix
+    return autofix.main(args.arguments)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tools for the Scottish Gaelic ARCOSG treebank.")
+    parser.add_argument("--time", action="store_true", help="report startup and run times on stderr")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate_parser = subparsers.add_parser("validate", help="run the Gaelic-specific checks")
+    validate_parser.add_argument("files", nargs="+")
+    validate_parser.add_argument("--summary", action="store_true",
+                                 help="print a summary by check and message instead of every finding")
+    validate_parser.set_defaults(handler=validate)
+
+    migrate_parser = subparsers.add_parser("migrate", help="apply the updates for a release")
+    migrate_parser.add_argument("release", choices=sorted(MIGRATIONS))
+    migrate_parser.add_argument("input")
+    migrate_parser.add_argument("output")
+    migrate_parser.add_argument("--workers", type=int,
+                                help="update in this many processes rather than in a thread alongside reading and writing")
+    migrate_parser.set_defaults(handler=migrate)
+
+    stats_parser = subparsers.add_parser("stats", help="count documents, sentences, tokens and words")
+    stats_parser.add_argument("files", nargs="+")
+    stats_parser.add_argument("--by", choices=COLUMNS, help="also count the values of this column")
+    stats_parser.set_defaults(handler=stats)
+
+    query_parser = subparsers.add_parser("query", help="find words by column values")
+    query_parser.add_argument("files", nargs="+")
+    query_parser.add_argument("--where", type=parse_condition, action="append", required=True,
+                              metavar="COLUMN[.KEY]=VALUE", help="condition to match, may be repeated")
+    query_parser.set_defaults(handler=query)
+
+    duplicates_parser = subparsers.add_parser("duplicates", add_help=False,
+                                              help="find duplicate sentences across splits")
+    duplicates_parser.set_defaults(handler=duplicates)
+
+    autofix_parser = subparsers.add_parser("autofix", add_help=False,
+                                           help="apply the fixes the checks suggest and write a patch")
+    autofix_parser.set_defaults(handler=autofix)
+
+    # Everything after `duplicates` or `autofix` is passed on to find_duplicates.py or autofix.py untouched.
+    args, arguments = parser.parse_known_args(argv)
+    if args.command not in ["duplicates", "autofix"] and arguments:
+        parser.error(f"unrecognized arguments: {' '.join(arguments)}")
+    args.arguments = arguments
+    ready = time.perf_counter()
+    status = args.handler(args)
+    if args.time:
+        finished = time.perf_counter()
+        print(f"startup {(ready - STARTED) * 1000:.1f} ms, {args.command} {(finished - ready) * 1000:.1f} ms",
+              file=sys.stderr)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
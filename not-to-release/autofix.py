@@ -0,0 +1,136 @@
+"""
+Applies the fixes that the checks in validate_gd_extras.py suggest and writes them out as one patch.
+
+Each sentence is validated with its diagnostics collected rather than printed.
+The fixes attached to them are applied to the tree in memory and that sentence alone is validated again,
+until a round applies no fixes or the round limit is reached.
+Sentences without fixes are only validated once,
+and the diagnostics from each sentence's last round are what is reported as remaining.
+
+Usage:
+    python autofix.py gd_arcosg-ud-dev.conllu
+    python autofix.py gd_arcosg-ud-dev.conllu --patch dev.patch --output fixed.conllu
+
+The patch can be reviewed and then applied with `git apply` or `patch -p1` from the top of the repository,
+wherever autofix.py was run from. For a file outside a git repository its paths are relative to the file's directory.
+It is made from udapi's output before and after the fixes, so a file that udapi would not write back
+exactly as it was read, for example one with a deprel on a multiword token line, is refused.
+What could not be fixed is printed as before, followed by the usual verdict.
+"""
+import argparse
+import difflib
+import itertools
+import os
+import subprocess
+import sys
+
+import validate_gd_extras
+from validate_gd_extras import collecting, speech_lemmata, validate_tree
+
+def autofix_tree(root, allowed_fixed, max_rounds=5) -> (list, list, int, int):
+    """
+    Applies fixes to one sentence until there are none left to apply.
+
+    Returns the list of (diagnostic line, fix) pairs that were applied
+    and the diagnostics, errors and warnings of the sentence as it was left.
+    The sentence is validated once more than the rounds of fixes applied, at most max_rounds + 1 times.
+    """
+    applied = []
+    for rounds in range(max_rounds + 1):
+        with collecting() as diagnostics:
+            errors, warnings = validate_tree(root, allowed_fixed, speech_lemmata)
+        if rounds == max_rounds:
+            break
+        round_applied = [(d.line, d.fix) for d in diagnostics if d.fix is not None and d.fix.apply()]
+        if round_applied == []:
+            break
+        applied += round_applied
+    return applied, diagnostics, errors, warnings
+
+def autofix_document(document, allowed_fixed, max_rounds=5) -> (list, list, int, int):
+    """
+    Applies fixes to every sentence in a udapi Document.
+
+    Returns the list of (diagnostic line, fix) pairs that were applied
+    and the remaining diagnostics, errors and warnings of the whole document.
+    """
+    applied = []
+    remaining = []
+    total_errors = 0
+    total_warnings = 0
+    for b in document.bundles:
+        tree_applied, diagnostics, errors, warnings = autofix_tree(b.get_tree(), allowed_fixed, max_rounds)
+        applied += tree_applied
+        remaining += diagnostics
+        total_errors += errors
+        total_warnings += warnings
+    return applied, remaining, total_errors, total_warnings
+
+def top_level(filename) -> str:
+    """
+    Returns the top directory of the git repository a file is in, or the file's own directory if it is in none.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    try:
+        result = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=directory,
+                                capture_output=True, text=True)
+    except OSError:
+        return directory
+    if result.returncode != 0:
+        return directory
+    return result.stdout.strip()
+
+def make_patch(filename, before, after) -> str:
+    """
+    Returns a unified diff between two versions of a file, with a/ and b/ prefixes like git
+    and the path relative to the top of its repository.
+    """
+    filename = os.path.relpath(os.path.realpath(filename), os.path.realpath(top_level(filename)))
+    return "".join(difflib.unified_diff(before.splitlines(keepends=True), after.splitlines(keepends=True),
+                                        fromfile=f"a/{filename}", tofile=f"b/{filename}"))
+
+def main(argv=None):
+    """
+    Fixes the CoNLL-U file named in the first argument and writes the patch.
+
+    Returns 0 if the fixed file passes validation, 1 if it still fails
+    and 2 if udapi would change the file before any fixes, so that the patch would not apply.
+    """
+    from udapi.core.document import Document
+    parser = argparse.ArgumentParser(description="Apply the fixes suggested by validate_gd_extras.py.")
+    parser.add_argument("file", help="CoNLL-U file")
+    parser.add_argument("--patch", help="where to write the patch (default FILE.autofix.patch)")
+    parser.add_argument("--output", help="also write the fixed CoNLL-U file here")
+    parser.add_argument("--max-rounds", type=int, default=5, help="fix and re-validate at most this often per sentence")
+    args = parser.parse_args(argv)
+
+    allowed_fixed = validate_gd_extras.read_fixed()
+    document = Document(filename = args.file)
+    before = document.to_conllu_string()
+    with open(args.file, encoding="utf-8") as source:
+        original = source.read()
+    if before != original:
+        pairs = enumerate(itertools.zip_longest(before.splitlines(), original.splitlines()), 1)
+        line = next((i for i, (a, b) in pairs if a != b), len(original.splitlines()))
+        print(f"{args.file}: line {line} would be rewritten by udapi, so a patch would not apply; "
+              "normalise the file first", file=sys.stderr)
+        return 2
+    applied, remaining, total_errors, total_warnings = autofix_document(document, allowed_fixed, args.max_rounds)
+    after = document.to_conllu_string()
+    for line, fix in applied:
+        print(f"F {line[2:]} => {fix.description}")
+
+    patch_filename = args.patch if args.patch is not None else args.file + ".autofix.patch"
+    with open(patch_filename, "w", encoding="utf-8") as patch:
+        patch.write(make_patch(args.file, before, after))
+    if args.output is not None:
+        document.store_conllu(args.output)
+    print(f"*** {len(applied)} fix{'es' if len(applied) != 1 else ''} written to {patch_filename} ***")
+
+    for diagnostic in remaining:
+        print(diagnostic.line)
+    validate_gd_extras.print_verdict(total_errors, total_warnings)
+    return 0 if total_errors == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Finds exact and near-duplicate sentences, in particular ones that leak between train, dev and test.
+
+The corpus is split by document, but formulaic sentences (sports commentary, conversational
+fillers) can recur across documents and so across splits.
+Each sentence gets a MinHash signature over character shingles of its normalised `# text`
+and word shingles of its normalised forms.
+Locality-sensitive hashing over bands of the signature finds candidate pairs without comparing
+every sentence with every other one.
+
+Usage:
+    python find_duplicates.py gd_arcosg-ud-train.conllu gd_arcosg-ud-dev.conllu gd_arcosg-ud-test.conllu
+
+With --stream the last file is only compared against the others and not indexed,
+so memory is bounded by the size of the other files however large the last one is:
+
+    python find_duplicates.py --stream gd_arcosg-ud-dev.conllu gd_arcosg-ud-test.conllu gd_arcosg-ud-train.conllu
+
+The indexed files are still compared with each other, so this finds the same pairs between splits
+as without --stream, only not pairs within the last file with --all-pairs.
+"""
+import argparse
+import os
+import re
+import zlib
+from collections import defaultdict
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+def normalise_text(text) -> str:
+    """
+    Lowercases, straightens curly quotes and collapses whitespace.
+    """
+    text = text.lower().replace("‘", "'").replace("’", "'").replace("“", '"').replace("”", '"')
+    return " ".join(text.split())
+
+def split_name(filename) -> str:
+    """
+    Returns train, dev or test for standard UD file names and the base name for anything else.
+    """
+    match = re.search(r"-ud-(train|dev|test)\.conllu", os.path.basename(filename))
+    if match is not None:
+        return match.group(1)
+    return os.path.basename(filename)
+
+def read_sentences(filename):
+    """
+    Yields a (sent_id, text, forms) tuple for each sentence in a CoNLL-U file.
+
+    Only the comments and the first two columns are looked at so no tree is built.
+    Multiword token ranges and empty nodes are skipped so the forms are the syntactic words.
+    """
+    sent_id = None
+    text = None
+    forms = []
+    with open(filename, encoding="utf-8") as conllu:
+        for line in conllu:
+            line = line.rstrip("\n")
+            if line == "":
+                if forms:
+                    yield sent_id, text if text is not None else " ".join(forms), forms
+                sent_id = None
+                text = None
+                forms = []
+            elif line.startswith("# sent_id = "):
+                sent_id = line[len("# sent_id = "):]
+            elif line.startswith("# text = "):
+                text = line[len("# text = "):]
+            elif not line.startswith("#"):
+                fields = line.split("\t", 2)
+                if "-" not in fields[0] and "." not in fields[0]:
+                    forms.append(fields[1])
+    if forms:
+        yield sent_id, text if text is not None else " ".join(forms), forms
+
+def shingles(text, forms, char_size=5) -> set:
+    """
+    Returns the set of hashed shingles for a sentence.
+
+    These are character n-grams of the normalised text and word bigrams of the normalised forms,
+    tagged so that the two kinds never collide.
+    """
+    result = set()
+    padded = f" {text} "
+    for i in range(max(1, len(padded) - char_size + 1)):
+        result.add(zlib.crc32(("t" + padded[i:i + char_size]).encode("utf-8")))
+    words = [normalise_text(f) for f in forms]
+    if len(words) == 1:
+        result.add(zlib.crc32(("f" + words[0]).encode("utf-8")))
+    for first, second in zip(words, words[1:]):
+        result.add(zlib.crc32(f"f{first}\t{second}".encode("utf-8")))
+    return result
+
+class MinHasher:
+    """
+    Computes one-permutation MinHash signatures (Li, Owen and Zhang 2012).
+
+    Each shingle is hashed once: the hash picks one of num_perm bins and the signature keeps the
+    smallest value in each bin, which costs one hash per shingle instead of num_perm of them.
+    Empty bins borrow the value of the next non-empty bin to the right, offset by the distance
+    (Shrivastava and Li 2014), so that short sentences still get comparable signatures.
+    """
+    def __init__(self, num_perm=128):
+        self.num_perm = num_perm
+        self.offset = (MAX_HASH + 1) // num_perm
+
+    def signature(self, hashes) -> tuple:
+        """
+        Returns the signature of a set of hashed shingles as a tuple of integers.
+        """
+        num_perm = self.num_perm
+        bins = [None] * num_perm
+        for h in hashes:
+            b = h % num_perm
+            value = h // num_perm
+            if bins[b] is None or value < bins[b]:
+                bins[b] = value
+        filled = [b for b in range(num_perm) if bins[b] is not None]
+        if not filled or len(filled) == num_perm:
+            return tuple(bins)
+        signature = list(bins)
+        following = filled[0] + num_perm
+        for b in range(num_perm - 1, -1, -1):
+            if bins[b] is not None:
+                following = b
+            else:
+                distance = following - b
+                signature[b] = bins[following % num_perm] + distance * self.offset
+        return tuple(signature)
+
+def similarity(signature1, signature2) -> float:
+    """
+    Returns the MinHash estimate of the Jaccard similarity of two signatures.
+    """
+    return sum(1 for x, y in zip(signature1, signature2) if x == y) / len(signature1)
+
+class LSHIndex:
+    """
+    Locality-sensitive hash index over the bands of MinHash signatures.
+
+    Two signatures sharing all the rows of any band become a candidate pair.
+    Buckets are capped at max_bucket entries so that a very common sentence (say "seadh")
+    cannot make a bucket grow without limit.
+    """
+    def __init__(self, bands, rows, max_bucket=1000):
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.entries = []
+
+    def band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, hash(signature[band * self.rows:(band + 1) * self.rows])
+
+    def candidates(self, signature) -> set:
+        """
+        Returns the indices of entries sharing at least one band with the signature.
+        """
+        found = set()
+        for band, key in self.band_keys(signature):
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def add(self, entry, signature) -> int:
+        """
+        Stores the entry and its signature and returns its index.
+        """
+        index = len(self.entries)
+        self.entries.append((entry, signature))
+        for band, key in self.band_keys(signature):
+            bucket = self.buckets[band][key]
+            if len(bucket) < self.max_bucket:
+                bucket.append(index)
+        return index
+
+def find_duplicates(indexed_files, query_files, threshold=0.8, num_perm=128, bands=16,
+                    min_tokens=3, all_pairs=False, max_bucket=1000):
+    """
+    Yields (similarity, kind, (split, sent_id), (split, sent_id)) for each duplicate pair.
+
+    Every sentence in indexed_files is kept in the index.
+    Sentences in query_files are compared with the index and then discarded, which is the streaming mode.
+    Pairs from the same split are only reported if all_pairs is set.
+    Sentences with exactly the same normalised text are reported as exact and only the first of them is indexed.
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    hasher = MinHasher(num_perm)
+    index = LSHIndex(bands, num_perm // bands, max_bucket)
+    exact = {}
+
+    def compare(split, sent_id, normalised, signature):
+        exact_index = exact.get(normalised)
+        if exact_index is not None:
+            other_entry = index.entries[exact_index][0]
+            if all_pairs or other_entry[0] != split:
+                yield 1.0, "exact", other_entry, (split, sent_id)
+        for candidate in sorted(index.candidates(signature)):
+            if candidate == exact_index:
+                continue
+            other_entry, other_signature = index.entries[candidate]
+            if not all_pairs and other_entry[0] == split:
+                continue
+            score = similarity(signature, other_signature)
+            if score >= threshold:
+                yield score, "near", other_entry, (split, sent_id)
+
+    for filename in [*indexed_files, *query_files]:
+        split = split_name(filename)
+        indexing = filename in indexed_files
+        for sent_id, text, forms in read_sentences(filename):
+            if len(forms) < min_tokens:
+                continue
+            normalised = normalise_text(text)
+            signature = hasher.signature(shingles(normalised, forms))
+            yield from compare(split, sent_id, normalised, signature)
+            if indexing and normalised not in exact:
+                exact[normalised] = index.add((split, sent_id), signature)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate sentences across splits.")
+    parser.add_argument("files", nargs="+", help="CoNLL-U files")
+    parser.add_argument("--threshold", type=float, default=0.8, help="minimum estimated Jaccard similarity")
+    parser.add_argument("--num-perm", type=int, default=128, help="number of MinHash permutations")
+    parser.add_argument("--bands", type=int, default=16, help="number of LSH bands")
+    parser.add_argument("--min-tokens", type=int, default=3, help="ignore sentences shorter than this")
+    parser.add_argument("--all-pairs", action="store_true", help="also report pairs from the same split")
+    parser.add_argument("--stream", action="store_true",
+                        help="index all but the last file and stream the last one against them")
+    parser.add_argument("--max-bucket", type=int, default=1000, help="maximum entries in an LSH bucket")
+    args = parser.parse_args(argv)
+    if args.stream:
+        if len(args.files) < 2:
+            parser.error("--stream needs at least two files")
+        indexed_files, query_files = args.files[:-1], args.files[-1:]
+    else:
+        indexed_files, query_files = args.files, []
+    total = 0
+    for score, kind, (split1, sent_id1), (split2, sent_id2) in find_duplicates(
+            indexed_files, query_files, threshold=args.threshold, num_perm=args.num_perm,
+            bands=args.bands, min_tokens=args.min_tokens, all_pairs=args.all_pairs,
+            max_bucket=args.max_bucket):
+        total += 1
+        print(f"{score:.2f}\t{kind}\t{split1}:{sent_id1}\t{split2}:{sent_id2}")
+    print(f"*** {total} duplicate pair{'s' if total != 1 else ''} ***")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Normalised views of forms and lemmata shared by the checks and the word lists they look things up in.
+
+Several checks compare a form or lemma with a list of words, allowing for lower case, curly quotes and
+the corrections and modernisations recorded in the MISC column.
+SentenceViews works these out once for every node in a sentence, so that a check looking at a node
+and its neighbours does not parse MISC again for each of them.
+The strings are interned, as are the word lists built with word_set(), so equal words are the same object.
+"""
+import sys
+
+QUOTES = str.maketrans({"‘": "'", "’": "'"})
+
+def normalise_form(form) -> str:
+    """
+    Lowercases and straightens curly single quotes.
+    """
+    return sys.intern(form.lower().translate(QUOTES))
+
+def lemma_view(node) -> str:
+    """
+    Returns CorrectLemma or ModernLemma from MISC if there is one, otherwise the lemma.
+    """
+    misc = node.misc
+    if misc["CorrectLemma"] != "":
+        return sys.intern(misc["CorrectLemma"])
+    if misc["ModernLemma"] != "":
+        return sys.intern(misc["ModernLemma"])
+    return sys.intern(node.lemma)
+
+class SentenceViews:
+    """
+    Views of each node in a sentence as columns indexed by ord,
+    so views.form[node.ord - 1] goes with node.prev_node.
+    Index 0 is the technical root.
+
+    corrected_form: CorrectForm or ModernForm from MISC, otherwise the form
+    form: CorrectForm or ModernForm from MISC, otherwise the normalised form
+    lemma: CorrectLemma or ModernLemma from MISC, otherwise the lemma
+    """
+    __slots__ = ("corrected_form", "form", "lemma")
+
+    def __init__(self, root):
+        self.corrected_form = []
+        self.form = []
+        self.lemma = []
+        for node in [root, *root.descendants]:
+            misc = node.misc
+            if misc["CorrectForm"] != "":
+                corrected_form = form = sys.intern(misc["CorrectForm"])
+            elif misc["ModernForm"] != "":
+                corrected_form = form = sys.intern(misc["ModernForm"])
+            else:
+                corrected_form = sys.intern(node.form)
+                form = normalise_form(node.form)
+            self.corrected_form.append(corrected_form)
+            self.form.append(form)
+            self.lemma.append(lemma_view(node))
+
+def word_set(words) -> frozenset:
+    """
+    Returns a word list as a frozenset of interned strings.
+    """
+    return frozenset(sys.intern(w) for w in words)
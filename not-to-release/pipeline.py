@@ -0,0 +1,382 @@
+"""
+Streams CoNLL-U files through a transform in overlapping stages, compressing and decompressing on the way.
+
+Files ending in .gz, .bz2 or .xz are decompressed when read and compressed when written, and so are
+.zst files if Python has compression.zstd (3.14 and later) or the zstandard package is installed.
+A file name of - means stdin or stdout.
+When the output goes to stdout, whatever the transform prints goes to stderr instead, out of the data.
+
+run_pipeline() connects three stages with bounded queues:
+1. a reader thread decompresses the input and parses it one sentence at a time into udapi trees,
+2. the calling thread applies the transform to each tree,
+3. a writer thread serialises the trees back to CoNLL-U and compresses them.
+The compressors and the file I/O release the GIL, so they overlap with the transform.
+Parsing and serialising are Python, so for transforms that need more than one core
+workers= moves parsing, the transform and serialising into a process pool, chunk by chunk,
+with the reader and writer threads still decompressing and compressing around it.
+At most queue_size sentences or chunks wait between two stages, so memory does not grow with the input,
+and the output is in the same order as the input.
+The output is written to a temporary file next to it that replaces it only once everything has been written,
+so a failure leaves no partial output and a file can be updated in place.
+
+Usage:
+    python update_ud2_17.py gd_arcosg-ud-train.conllu.gz gd_arcosg-ud-train.conllu.zst
+    python arcosg.py migrate 2.17 in.conllu.gz out.conllu.gz --workers 4
+"""
+import bz2
+import gzip
+import io
+import lzma
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+COMPRESSED = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+DONE = object()
+# Text is read from the decompressor and written to the compressor in blocks of about this many characters,
+# so that the stages do not wait on each other for the GIL every few kilobytes.
+BLOCK_SIZE = 1 << 20
+
+def zstd_open():
+    """
+    Returns the open() of whichever zstd module is available.
+
+    Raises OSError if there is none.
+    """
+    try:
+        from compression import zstd
+        return zstd.open
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard.open
+    except ImportError:
+        raise OSError("reading or writing .zst files needs Python 3.14 or the zstandard package") from None
+
+def is_compressed(filename) -> bool:
+    return filename.endswith((*COMPRESSED, ".zst"))
+
+def open_text(filename, mode="r"):
+    """
+    Opens a file for reading ("r") or writing ("w") as UTF-8 text, compressed according to its extension.
+    """
+    if filename == "-":
+        stream = sys.__stdin__ if mode == "r" else sys.__stdout__
+        return open(stream.fileno(), mode, encoding="utf-8", closefd=False)
+    if filename.endswith(".zst"):
+        return io.TextIOWrapper(zstd_open()(filename, mode + "b"), encoding="utf-8")
+    for extension, opener in COMPRESSED.items():
+        if filename.endswith(extension):
+            return io.TextIOWrapper(opener(filename, mode + "b"), encoding="utf-8")
+    return open(filename, mode, encoding="utf-8")
+
+def read_lines(stream):
+    """
+    Yields the lines of a text stream without line ends, reading it BLOCK_SIZE characters at a time.
+    """
+    rest = ""
+    while True:
+        text = stream.read(BLOCK_SIZE)
+        if text == "":
+            break
+        lines = (rest + text).split("\n")
+        rest = lines.pop()
+        yield from lines
+    if rest != "":
+        yield rest
+
+def read_blocks(lines):
+    """
+    Yields the lines of each sentence, without line ends or the blank line after it.
+    """
+    block = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.strip() == "":
+            if block:
+                yield block
+                block = []
+        else:
+            block.append(line)
+    if block:
+        yield block
+
+class ThreadStdout:
+    """
+    Stands in for sys.stdout so that one thread can capture what it prints without capturing other threads.
+
+    udapi writers print to sys.stdout, and the transform and the checks print their messages there too.
+    """
+    def __init__(self, stdout):
+        self.stdout = stdout
+        self.local = threading.local()
+
+    def write(self, text):
+        return getattr(self.local, "buffer", self.stdout).write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stdout, name)
+
+class Parser:
+    """
+    Turns sentence blocks into udapi trees.
+
+    Each tree goes in a bundle of its own that the document does not keep,
+    so memory is freed as soon as a tree has been written.
+    """
+    def __init__(self):
+        from udapi.block.read.conllu import Conllu
+        from udapi.core.document import Document
+        self.reader = Conllu(filehandle=io.StringIO(""))
+        self.document = Document()
+
+    def parse(self, lines):
+        """
+        Returns the tree for the lines of one sentence, or None if there are no tokens.
+        """
+        from udapi.core.bundle import Bundle
+        root = self.reader.read_tree_from_lines(lines)
+        if root is None:
+            return None
+        bundle_id = None
+        if root._sent_id is not None:
+            bundle_id, _, zone = root._sent_id.partition("/")
+            if zone:
+                root.zone = zone
+        Bundle(bundle_id, self.document).add_tree(root)
+        self.document.meta["global.Entity"] = self.reader._global_entity
+        return root
+
+class Serialiser:
+    """
+    Turns udapi trees back into CoNLL-U text, as Document.store_conllu() would write them.
+    """
+    def __init__(self, stdout):
+        from udapi.block.write.conllu import Conllu
+        self.writer = Conllu()
+        self.stdout = stdout
+
+    def serialise(self, root) -> str:
+        buffer = self.stdout.local.buffer = io.StringIO()
+        try:
+            self.writer.process_tree(root)
+        finally:
+            del self.stdout.local.buffer
+        return buffer.getvalue()
+
+def parse_file(filename):
+    """
+    Yields the tree for each sentence in a CoNLL-U file, which may be compressed.
+    """
+    parser = Parser()
+    with open_text(filename) as conllu:
+        for lines in read_blocks(read_lines(conllu)):
+            root = parser.parse(lines)
+            if root is not None:
+                yield root
+
+class _Failed:
+    """
+    Passed along a queue in place of the next item when the stage producing it raised an exception.
+    """
+    def __init__(self, exception):
+        self.exception = exception
+
+def _put(items, item, stop) -> bool:
+    """
+    Puts an item on a queue, waiting for room until stop is set.
+
+    Returns False if it was stopped.
+    """
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _produce(generator, items, stop):
+    """
+    Puts everything a generator yields on a queue, then DONE, or _Failed if the generator raised an exception.
+    """
+    try:
+        for item in generator:
+            if not _put(items, item, stop):
+                return
+    except BaseException as e:
+        _put(items, _Failed(e), stop)
+        return
+    finally:
+        generator.close()
+    _put(items, DONE, stop)
+
+def _consume(items):
+    """
+    Yields what a producer puts on a queue, re-raising its exception if it failed.
+    """
+    while True:
+        item = items.get()
+        if item is DONE:
+            return
+        if isinstance(item, _Failed):
+            raise item.exception
+        yield item
+
+def _in_background(generator, queue_size=64):
+    """
+    Yields what a generator yields, running the generator in a thread of its own at most queue_size items ahead.
+    """
+    stop = threading.Event()
+    items = queue.Queue(queue_size)
+    thread = threading.Thread(target=_produce, args=(generator, items, stop), daemon=True)
+    thread.start()
+    try:
+        yield from _consume(items)
+    finally:
+        stop.set()
+        thread.join()
+
+def read_trees(filename, queue_size=64):
+    """
+    Yields the tree for each sentence in a CoNLL-U file, which may be compressed,
+    decompressing and parsing in a thread of its own.
+    """
+    yield from _in_background(parse_file(filename), queue_size)
+
+def temporary_filename(filename) -> str:
+    """
+    Returns a name for a temporary file in the same directory and with the same extension as filename.
+    """
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f".tmp-{os.getpid()}-{name}")
+
+def _write(items, filename, serialise, failures, aborted):
+    """
+    Writes what is put on a queue to a temporary file until DONE, then moves it to filename
+    unless aborted has been set.
+
+    If writing fails the exception is added to failures and the queue is still emptied up to DONE,
+    unless DONE has already been taken, so that the stage putting things on it is not left waiting.
+    """
+    path = filename if filename == "-" else temporary_filename(filename)
+    done = False
+    try:
+        with open_text(path, "w") as output:
+            texts = []
+            size = 0
+            for item in _consume(items):
+                text = serialise(item)
+                texts.append(text)
+                size += len(text)
+                if size >= BLOCK_SIZE:
+                    output.write("".join(texts))
+                    texts = []
+                    size = 0
+            done = True
+            output.write("".join(texts))
+        if path != filename:
+            if aborted.is_set():
+                os.remove(path)
+            else:
+                os.replace(path, filename)
+    except BaseException as e:
+        failures.append(e)
+        if path != filename and os.path.exists(path):
+            os.remove(path)
+        while not done and items.get() is not DONE:
+            pass
+
+def run_pipeline(input_filename, transform, output_filename, queue_size=64, workers=None, chunk_size=64) -> int:
+    """
+    Reads each sentence in input_filename, calls transform on its tree and writes the tree to output_filename.
+    Either file may be compressed.
+
+    With workers set the transform runs in that many processes and has to be a module-level function,
+    so that it can be sent to them.
+    Returns the number of sentences.
+    """
+    previous = sys.stdout
+    sys.stdout = stdout = ThreadStdout(sys.stderr if output_filename == "-" else previous)
+    try:
+        if workers is None:
+            return _run_threads(input_filename, transform, output_filename, queue_size, stdout)
+        return _run_processes(input_filename, transform, output_filename, queue_size, workers, chunk_size)
+    finally:
+        sys.stdout = previous
+
+def _run_stages(sentences, output_filename, queue_size, serialise) -> int:
+    writes = queue.Queue(queue_size)
+    failures = []
+    aborted = threading.Event()
+    writer = threading.Thread(target=_write, args=(writes, output_filename, serialise, failures, aborted),
+                              daemon=True)
+    writer.start()
+    count = 0
+    try:
+        for item, n in sentences:
+            writes.put(item)
+            count += n
+    except BaseException:
+        aborted.set()
+        raise
+    finally:
+        writes.put(DONE)
+        writer.join()
+    if failures:
+        raise failures[0]
+    return count
+
+def _run_threads(input_filename, transform, output_filename, queue_size, stdout) -> int:
+    def transformed():
+        for root in read_trees(input_filename, queue_size):
+            transform(root)
+            yield root, 1
+    return _run_stages(transformed(), output_filename, queue_size, Serialiser(stdout).serialise)
+
+def _run_processes(input_filename, transform, output_filename, queue_size, workers, chunk_size) -> int:
+    def chunks():
+        with open_text(input_filename) as conllu:
+            blocks = read_blocks(read_lines(conllu))
+            while True:
+                chunk = list(islice(blocks, chunk_size))
+                if chunk == []:
+                    return
+                yield chunk
+    def transformed(executor):
+        pending = []
+        for chunk in _in_background(chunks(), queue_size):
+            pending.append(executor.submit(_process_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+    # The workers are started while the reader thread is running, and a process forked from one with threads
+    # can deadlock on a lock another thread held, so they are spawned instead.
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_start_worker,
+                             initargs=(transform, output_filename == "-")) as executor:
+        return _run_stages(transformed(executor), output_filename, queue_size, str)
+
+# Each worker process parses its chunks with a reader of its own, so a `# global.Entity` comment
+# (not used in this treebank) is not seen by sentences that follow it in another worker's chunk.
+_worker = None
+
+def _start_worker(transform, to_stderr):
+    global _worker
+    sys.stdout = ThreadStdout(sys.stderr if to_stderr else sys.stdout)
+    _worker = (Parser(), Serialiser(sys.stdout), transform)
+
+def _process_chunk(chunk) -> (str, int):
+    parser, serialiser, transform = _worker
+    texts = []
+    for lines in chunk:
+        root = parser.parse(lines)
+        if root is not None:
+            transform(root)
+            texts.append(serialiser.serialise(root))
+    return "".join(texts), len(texts)
@@ -0,0 +1,281 @@
+"""
+Binary snapshots of CoNLL-U files for fast loading.
+
+A snapshot is written alongside the CoNLL-U file as `<name>.conllu.snap` and holds
+* a header with the SHA-256 of the CoNLL-U file it was made from,
+* a sentence table of (first comment, comment count, first token, token count),
+* the comment lines as string ids,
+* the token lines (including multiword token ranges and empty nodes) as ten string ids each and
+* a string table in which every distinct comment and column value appears once.
+
+All the tables are arrays of little-endian unsigned 32-bit integers, so loading is an mmap and a cast
+rather than a parse.
+Snapshots are for tools that work on the columns, such as `arcosg.py stats` and `query`.
+Tools that need udapi trees parse the text, since building the trees is most of the cost either way.
+A snapshot is only written if it converts back to exactly the same text as the CoNLL-U file,
+and it is only used if the hash still matches, so a stale snapshot is rebuilt rather than trusted.
+The header also has the size and CRC-32 of everything after it, so a truncated or damaged snapshot is rebuilt too.
+
+Usage:
+    python snapshot.py gd_arcosg-ud-dev.conllu gd_arcosg-ud-test.conllu
+    python snapshot.py --restore gd_arcosg-ud-dev.conllu.snap restored.conllu
+"""
+import argparse
+import hashlib
+import io
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b"GDSNAP\0\0"
+VERSION = 2
+# magic, version, CRC-32 of the rest of the file, sha256, strings, sentences, comments, tokens, string table bytes
+HEADER = struct.Struct("<8sII32sIIIIQ")
+COLUMNS = 10
+SUFFIX = ".snap"
+
+def source_digest(filename) -> bytes:
+    """
+    Returns the SHA-256 digest of a file.
+    """
+    with open(filename, "rb") as source:
+        return hashlib.sha256(source.read()).digest()
+
+def snapshot_filename(filename) -> str:
+    return filename + SUFFIX
+
+def _little_endian(values) -> array:
+    values = array("I", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def write_snapshot(filename, snapshot_path=None) -> str:
+    """
+    Writes a snapshot of a CoNLL-U file and returns its path.
+
+    Raises ValueError if the file would not convert back losslessly,
+    for example if it has comments after the first token of a sentence.
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_filename(filename)
+    with open(filename, "rb") as source:
+        data = source.read()
+    text = data.decode("utf-8")
+    string_ids = {}
+    sentences = array("I")
+    comments = array("I")
+    tokens = array("I")
+
+    def intern(value):
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(string_ids)
+        return string_id
+
+    for block in text.split("\n\n"):
+        if block == "":
+            continue
+        first_comment = len(comments)
+        first_token = len(tokens) // COLUMNS
+        for line in block.split("\n"):
+            if line.startswith("#"):
+                if len(tokens) // COLUMNS != first_token:
+                    raise ValueError(f"{filename}: comment after tokens: {line}")
+                comments.append(intern(line))
+            else:
+                fields = line.split("\t")
+                if len(fields) != COLUMNS:
+                    raise ValueError(f"{filename}: expected {COLUMNS} columns: {line}")
+                tokens.extend(intern(f) for f in fields)
+        sentences.extend((first_comment, len(comments) - first_comment,
+                          first_token, len(tokens) // COLUMNS - first_token))
+
+    strings = list(string_ids)
+    snapshot = Snapshot.from_tables(strings, sentences, comments, tokens)
+    if snapshot.to_conllu() != text:
+        raise ValueError(f"{filename} cannot be converted to a snapshot losslessly")
+    string_table = "\n".join(strings).encode("utf-8")
+    payload = [_little_endian(table).tobytes() for table in (sentences, comments, tokens)] + [string_table]
+    checksum = 0
+    for part in payload:
+        checksum = zlib.crc32(part, checksum)
+    header = HEADER.pack(MAGIC, VERSION, checksum, hashlib.sha256(data).digest(), len(strings),
+                         len(sentences) // 4, len(comments), len(tokens) // COLUMNS, len(string_table))
+    temporary_path = snapshot_path + ".tmp"
+    with open(temporary_path, "wb") as output:
+        output.write(header)
+        for part in payload:
+            output.write(part)
+    os.replace(temporary_path, snapshot_path)
+    return snapshot_path
+
+class Snapshot:
+    """
+    A loaded snapshot.
+
+    Sentences can be read as (comments, tokens) tuples of strings without building trees
+    or converted back to CoNLL-U text.
+    """
+    def __init__(self, filename=None):
+        self.digest = None
+        self._mmap = None
+        self._views = []
+        if filename is not None:
+            self._load(filename)
+
+    @classmethod
+    def from_tables(cls, strings, sentences, comments, tokens):
+        snapshot = cls()
+        snapshot.strings = strings
+        snapshot.sentence_table = sentences
+        snapshot.comment_table = comments
+        snapshot.token_table = tokens
+        return snapshot
+
+    def _load(self, filename):
+        with open(filename, "rb") as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        try:
+            self._read_tables(filename, buffer)
+        except BaseException:
+            buffer.release()
+            self.close()
+            raise
+        buffer.release()
+
+    def _read_tables(self, filename, buffer):
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{filename} is truncated or damaged")
+        magic, version, checksum, digest, n_strings, n_sentences, n_comments, n_tokens, string_bytes = \
+            HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a version {VERSION} snapshot")
+        size = HEADER.size + (n_sentences * 4 + n_comments + n_tokens * COLUMNS) * 4 + string_bytes
+        if len(buffer) != size or zlib.crc32(buffer[HEADER.size:]) != checksum:
+            raise ValueError(f"{filename} is truncated or damaged")
+        self.digest = digest
+        offset = HEADER.size
+        tables = []
+        for length in (n_sentences * 4, n_comments, n_tokens * COLUMNS):
+            view = buffer[offset:offset + length * 4].cast("I")
+            offset += length * 4
+            if sys.byteorder != "little":
+                view = _little_endian(view)
+            else:
+                self._views.append(view)
+            tables.append(view)
+        self.sentence_table, self.comment_table, self.token_table = tables
+        # "".split("\n") is [""], so a file with no strings at all needs its own case.
+        string_table = bytes(buffer[offset:offset + string_bytes]).decode("utf-8")
+        self.strings = string_table.split("\n") if n_strings > 0 else []
+        if len(self.strings) != n_strings:
+            raise ValueError(f"{filename} has a damaged string table")
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.sentence_table) // 4
+
+    def sentences(self):
+        """
+        Yields a (comments, tokens) tuple for each sentence, where comments is a list of lines
+        and tokens is a list of ten-column lists.
+        """
+        lookup = self.strings.__getitem__
+        comment_values = list(map(lookup, self.comment_table))
+        token_values = list(map(lookup, self.token_table))
+        sentence_table = self.sentence_table.tolist()
+        for i in range(0, len(sentence_table), 4):
+            first_comment, n_comments, first_token, n_tokens = sentence_table[i:i + 4]
+            comments = comment_values[first_comment:first_comment + n_comments]
+            tokens = [token_values[j:j + COLUMNS]
+                      for j in range(first_token * COLUMNS, (first_token + n_tokens) * COLUMNS, COLUMNS)]
+            yield comments, tokens
+
+    def to_conllu(self) -> str:
+        """
+        Returns the original CoNLL-U text.
+        """
+        output = io.StringIO()
+        for comments, tokens in self.sentences():
+            for comment in comments:
+                output.write(comment + "\n")
+            for fields in tokens:
+                output.write("\t".join(fields) + "\n")
+            output.write("\n")
+        return output.getvalue()
+
+def load_snapshot(filename):
+    """
+    Returns a Snapshot for a CoNLL-U file, writing a new snapshot first if there is none
+    or if the CoNLL-U file has changed since it was written.
+    """
+    snapshot_path = snapshot_filename(filename)
+    digest = source_digest(filename)
+    if os.path.exists(snapshot_path):
+        try:
+            snapshot = Snapshot(snapshot_path)
+        except (ValueError, struct.error):
+            snapshot = None
+        if snapshot is not None:
+            if snapshot.digest == digest:
+                return snapshot
+            snapshot.close()
+    write_snapshot(filename, snapshot_path)
+    return Snapshot(snapshot_path)
+
+def iter_sentences(filename):
+    """
+    Yields a (comments, tokens) tuple for each sentence in a CoNLL-U file, as Snapshot.sentences() does.
+
+    Goes through the snapshot where possible and otherwise splits the text as it is read,
+    which is what happens with compressed files.
+    """
+    from pipeline import is_compressed, open_text, read_blocks
+    snapshot = None
+    if not is_compressed(filename):
+        try:
+            snapshot = load_snapshot(filename)
+        except (OSError, ValueError):
+            pass
+    if snapshot is not None:
+        with snapshot:
+            yield from snapshot.sentences()
+        return
+    with open_text(filename) as conllu:
+        for lines in read_blocks(conllu):
+            yield [l for l in lines if l.startswith("#")], [l.split("\t") for l in lines if not l.startswith("#")]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write or restore binary snapshots of CoNLL-U files.")
+    parser.add_argument("files", nargs="+", help="CoNLL-U files, or with --restore a snapshot and an output file")
+    parser.add_argument("--restore", action="store_true", help="convert a snapshot back to CoNLL-U")
+    args = parser.parse_args(argv)
+    if args.restore:
+        if len(args.files) != 2:
+            parser.error("--restore takes a snapshot and an output file")
+        with Snapshot(args.files[0]) as snapshot, open(args.files[1], "w", encoding="utf-8") as output:
+            output.write(snapshot.to_conllu())
+        return
+    for filename in args.files:
+        print(write_snapshot(filename))
+
+if __name__ == "__main__":
+    main()
@@ -3,39 +3,57 @@ Applies updates for Scottish Gaelic CONLL files for Universal Dependencies relea
 """
 
 import sys
-from udapi.core.document import Document
-
-document = Document(filename = sys.argv[1])
 
 genders = { "m": "Masc", "f": "Fem" }
 numbers = { "s": "Sing", "p": "Plur" }
 cases = { "d": "Dat", "g": "Gen"}
 
-for b in document.bundles:
-    root = b.get_tree()
-    nodes = root.descendants
-    for node in nodes:
-        if node.upos == "DET" and node.xpos.startswith("Td"):
-            """
-            https://github.com/UniversalDependencies/UD_Scottish_Gaelic-ARCOSG/issues/60
-            """
-            if len(node.xpos) > 3:
-                node.feats["Definite"] = "Def"
-                node.feats["PronType"] = "Art"
-                node.feats["Number"] = numbers[node.xpos[2]]
-                if node.xpos[3] in ["m", "f"]:
-                    node.feats["Gender"] = genders[node.xpos[3]]
-                if len(node.xpos) > 4 and node.xpos[4] in ["d", "g"]:
-                    node.feats["Case"] = cases[node.xpos[4]]
-        if node.upos == "AUX":
-            """
-            https://github.com/UniversalDependencies/UD_Scottish_Gaelic-ARCOSG/issues/61
-            """
-            if node.xpos.startswith("W"):
-                node.feats["VerbForm"] = "Fin"
-                if "q" in node.xpos:
-                    node.feats["Mood"] = "Int"
-                else:
-                    node.feats["Mood"] = "Ind"
+def update_node(node):
+    """
+    Applies the updates to one node.
+    """
+    if node.upos == "DET" and node.xpos.startswith("Td"):
+        """
+        https://github.com/UniversalDependencies/UD_Scottish_Gaelic-ARCOSG/issues/60
+        """
+        if len(node.xpos) > 3:
+            node.feats["Definite"] = "Def"
+            node.feats["PronType"] = "Art"
+            node.feats["Number"] = numbers[node.xpos[2]]
+            if node.xpos[3] in ["m", "f"]:
+                node.feats["Gender"] = genders[node.xpos[3]]
+            if len(node.xpos) > 4 and node.xpos[4] in ["d", "g"]:
+                node.feats["Case"] = cases[node.xpos[4]]
+    if node.upos == "AUX":
+        """
+        https://github.com/UniversalDependencies/UD_Scottish_Gaelic-ARCOSG/issues/61
+        """
+        if node.xpos.startswith("W"):
+            node.feats["VerbForm"] = "Fin"
+            if "q" in node.xpos:
+                node.feats["Mood"] = "Int"
+            else:
+                node.feats["Mood"] = "Ind"
+
+def update_tree(root):
+    """
+    Applies the updates to every node in one sentence.
+    """
+    for node in root.descendants:
+        update_node(node)
+
+def main(argv=None):
+    """
+    Reads the CoNLL-U file named in the first argument, updates it and writes it to the second.
+
+    Either file may be compressed (.gz, .bz2, .xz or .zst) and - means stdin or stdout.
+    The second may be the same as the first, to update a file in place.
+    Reading, updating and writing run at the same time, one sentence after another.
+    """
+    from pipeline import run_pipeline
+    if argv is None:
+        argv = sys.argv[1:]
+    run_pipeline(argv[0], update_tree, argv[1])
 
-document.store_conllu(sys.argv[2])
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,83 @@ Checks for things that aren't covered by the standard UD validation tools.
 
 Some of these are specific to Scottish Gaelic and others are generic.
 """
+import os
 import sys
-from collections import Counter
-from udapi.core.document import Document
+import threading
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from normalise import SentenceViews, word_set
+
+# A diagnostic is the printed line, the node it is about, optionally a Fix, the check that reported it
+# and any phrases of several words quoted in the line.
+Diagnostic = namedtuple("Diagnostic", ["line", "node", "fix", "rule", "phrases"])
+
+class Fix:
+    """
+    A change that a check knows will resolve what it reported, for example a new deprel.
+
+    Each change is (node, attribute, key, new value) where the attribute is "deprel", "parent",
+    "feats" or "misc" and the key is the feature name for the last two.
+    The values at the time of the check are kept so that a fix made stale by an earlier fix
+    to the same sentence is skipped rather than applied on top of it.
+    """
+    def __init__(self, description, changes):
+        self.description = description
+        self.changes = [(node, attribute, key, Fix.current(node, attribute, key), value)
+                        for node, attribute, key, value in changes]
+
+    @staticmethod
+    def current(node, attribute, key):
+        if attribute in ["feats", "misc"]:
+            return getattr(node, attribute)[key]
+        return getattr(node, attribute)
+
+    def apply(self) -> bool:
+        """
+        Makes the changes and returns True, or returns False if the sentence has changed since the check
+        or there is nothing to change.
+        """
+        if any(Fix.current(node, attribute, key) is not old for node, attribute, key, old, _ in self.changes
+               if attribute == "parent"):
+            return False
+        if any(Fix.current(node, attribute, key) != old for node, attribute, key, old, _ in self.changes
+               if attribute != "parent"):
+            return False
+        if all(old == value for _, _, _, old, value in self.changes):
+            return False
+        for node, attribute, key, _, value in self.changes:
+            if attribute in ["feats", "misc"]:
+                getattr(node, attribute)[key] = value
+            else:
+                setattr(node, attribute, value)
+        return True
+
+_collector = threading.local()
+
+def report(rule, line, node=None, fix=None, phrases=()):
+    """
+    Prints a diagnostic line, or keeps it if diagnostics are being collected in this thread.
+    The rule is the name of the check reporting it, which the summary groups by.
+    Phrases quoted in the line need to be passed too, as the summary cannot tell where they end.
+    """
+    diagnostics = getattr(_collector, "diagnostics", None)
+    if diagnostics is None:
+        print(line)
+    else:
+        diagnostics.append(Diagnostic(line, node, fix, rule, phrases))
+
+@contextmanager
+def collecting():
+    """
+    Collects the diagnostics reported in this thread into a list instead of printing them.
+    """
+    previous = getattr(_collector, "diagnostics", None)
+    _collector.diagnostics = []
+    try:
+        yield _collector.diagnostics
+    finally:
+        _collector.diagnostics = previous
 
 def check_bi(node) -> int:
     """
@@ -21,12 +95,12 @@ def check_bi(node) -> int:
     if "xcomp:pred" not in deprels and deprels != []:
         possible_predicates = [n for n in node.children if possible_predicate(n)]
         if possible_predicates != []:
-            print(f"E {node.address()} should have an xcomp:pred among {possible_predicates}")
+            report("check_bi", f"E {node.address()} should have an xcomp:pred among {possible_predicates}", node)
         objs = [p for p in possible_predicates if p.deprel == "obj" and p.upos != "PART"]
         for obj in objs:
             # check what Irish does about obj of bi.
             errors += 1
-            print(f"E {obj.address()} bi should not have obj")
+            report("check_bi", f"E {obj.address()} bi should not have obj", obj)
     return errors
 
 def check_clause_types(node, speech_lemmata) -> (int, int):
@@ -49,16 +123,16 @@ def check_clause_types(node, speech_lemmata) -> (int, int):
     if "mark" in child_deprels:
         if node.udeprel != "advcl" and node.parent.lemma not in speech_lemmata:
             warnings += 1
-            print(f"W {node.address()} deprel should be advcl:* not {node.deprel}")                
+            report("check_clause_types", f"W {node.address()} deprel should be advcl:* not {node.deprel}", node)
     elif "mark:prt" in child_deprels:
         particle_children = [c for c in node.children if c.upos == "PART"]
         for particle in particle_children:
             if particle.feats["PartType"] == "Cmpl" and node.deprel != "ccomp":
                 warnings += 1
-                print(f"W {node.address()} deprel should be ccomp not {node.deprel}")
+                report("check_clause_types", f"W {node.address()} deprel should be ccomp not {node.deprel}", node)
             if particle.feats["PronType"] == "Rel" and node.deprel != "acl:relcl":
                 warnings += 1
-                print(f"W {node.address()} deprel should be acl:relcl not {node.deprel}")
+                report("check_clause_types", f"W {node.address()} deprel should be acl:relcl not {node.deprel}", node)
     return errors, warnings
 
 def check_cleft(node) -> int:
@@ -71,79 +145,72 @@ def check_cleft(node) -> int:
     if "csubj:cleft" in child_deprels or "csubj:outer" in child_deprels:
         if "CleftType" not in node.feats:
             errors += 1
-            print(f"E {node.address()} is a cleft and should have CleftType")
+            report("check_cleft", f"E {node.address()} is a cleft and should have CleftType", node)
     if "csubj:cleft" not in child_deprels and "csubj:outer" not in child_deprels and "CleftType" in node.feats:
         cleft_phrase = " ".join([d.form for d in node.descendants(add_self = True)])
         errors += 1
-        print(f"E {node.address()} '{cleft_phrase}' is not a cleft and '{node.form}' should not have CleftType")
+        report("check_cleft", f"E {node.address()} '{cleft_phrase}' is not a cleft and '{node.form}' should not have CleftType",
+               node, phrases=[cleft_phrase])
     return errors
 
-def check_closed_classes(sentence) -> int:
+# Allowed lemmata for the closed classes checked by check_closed_classes().
+# ADP: 'ar' is a variant of 'thar' here, 'ma' is a variant of 'mu'.
+# DET: 'sa' is a variant of 'seo'
+closed_class_lemmata = {
+    "ADP": word_set([
+        "a", "à", "ach", "ag", "an", "aig", "air", "ar", "as", "ás", "bho", "cum", "de", "do", "eadar", "fa",
+        "far", "fo", "gun", "gu", "gus", "le", "ma", "mar", "mu", "mun", "na", "o", "os", "rè",
+        "ri", "ro", "roimh", "seach", "thar", "tre", "treimh", "tro", "troimh", "tarsaing", "tarsainn",
+        "tarsuinn",
+        "aindeoin", "ainneoin", "airson", "a-measg", "am-measg", "aonais", "a-rèir", "a-réir",
+        "a-thaobh", "beul",
+        "broinn", "cionn", "cùl", "deidh",
+        "dèidh", "déidh", "deidhinn", "feadh", "lùib", "measg", "rèir", "ruige", "réir", "sgath", "son",
+        "taca", "timcheall", "timchioll"
+    ]),
+    "DET": word_set([
+        "a", "an", "ar", "do", "gach", "mo", "sa", "san", "seo", "sin", "sineach", "siud", "ud",
+        "uile", "ur"
+    ]),
+    "CCONJ": word_set([
+        "a", "ach", "agus", "air", "is", "na", "neo", "no", "so", "oir", "sgàth", "thoireadh",
+        "thoradh"
+    ]),
+    "PRON": word_set([
+        "na",
+        "mo", "do", "a", "ar", "ur", "an",
+        "mi", "thu", "e", "i", "sinn", "sibh", "iad",
+        "seo", "so", "sin", "sean", "siud", "siod",
+        "a-seo", "a-sin", "a-siud",
+        "seothach", "sineach", "siudach", "siodach",
+        "fèin", "féin", "cèile", "céile", "a-chèile",
+        "bè", "cà", "cà'", "c'à", "càil", "càit", "càite", "carson", "cia", "ciamar", "cò", "có", "cuine",
+        "dè", "dé", "diamar", "ge", "b'e", "gu", "mar", "mheud", "car", "son",
+        "gar", "bith", "brith"
+    ]),
+    "SCONJ": word_set([
+        "a", "'air", "air", "airson", "'ar", "agus", "am", "an", "aon", "as",
+        "bho", "bhon", "bho'n", "bith", "brì", "brith",
+        "chionn", "co-dhiù",
+        "fad", "far", "feadh", "fhad", "fiù",
+        "gair", "ge", "ged", "gu", "gus", "is", "leis", "linn",
+        "ma", "man", "mar", "mara", "mas", "mu", "mun", "mur", "mura", "mus",
+        "nuair", "'nuair", "ò", "o", "o'n", "on", "ri", "sailleadh", "seach", "sgàth",
+        "theagamh", "uair"
+    ])
+}
+
+def check_closed_classes(node, views) -> int:
     """
     Some parts of speech do not readily take new members - prepositions, conjunctions and
     determiners for example. This means we can write a list of allowed lemmata and check
     against them as unlisted ones are likely to be tagging errors.
     """
     errors = 0
-    """
-    Notes:
-    ADP: 'ar' is a variant of 'thar' here, 'ma' is a variant of 'mu'.
-    DET: 'sa' is a variant of 'seo'
-    """
-
-    allowed = {
-        "ADP": [
-            "a", "à", "ach", "ag", "an", "aig", "air", "ar", "as", "ás", "bho", "cum", "de", "do", "eadar", "fa",
-            "far", "fo", "gun", "gu", "gus", "le", "ma", "mar", "mu", "mun", "na", "o", "os", "rè",
-            "ri", "ro", "roimh", "seach", "thar", "tre", "treimh", "tro", "troimh", "tarsaing", "tarsainn",
-            "tarsuinn",
-            "aindeoin", "ainneoin", "airson", "a-measg", "am-measg", "aonais", "a-rèir", "a-réir",
-            "a-thaobh", "beul",
-            "broinn", "cionn", "cùl", "deidh",
-            "dèidh", "déidh", "deidhinn", "feadh", "lùib", "measg", "rèir", "ruige", "réir", "sgath", "son",
-            "taca", "timcheall", "timchioll"
-        ],
-        "DET": [
-            "a", "an", "ar", "do", "gach", "mo", "sa", "san", "seo", "sin", "sineach", "siud", "ud",
-            "uile", "ur"
-        ],
-        "CCONJ": [
-            "a", "ach", "agus", "air", "is", "na", "neo", "no", "so", "oir", "sgàth", "thoireadh",
-            "thoradh"
-        ],
-        "PRON": [
-            "na",
-            "mo", "do", "a", "ar", "ur", "an",
-            "mi", "thu", "e", "i", "sinn", "sibh", "iad",
-            "seo", "so", "sin", "sean", "siud", "siod",
-            "a-seo", "a-sin", "a-siud",
-            "seothach", "sineach", "siudach", "siodach",
-            "fèin", "féin", "cèile", "céile", "a-chèile",
-            "bè", "cà", "cà'", "c'à", "càil", "càit", "càite", "carson", "cia", "ciamar", "cò", "có", "cuine",
-            "dè", "dé", "diamar", "ge", "b'e", "gu", "mar", "mheud", "car", "son",
-            "gar", "bith", "brith"
-        ],
-        "SCONJ": [
-            "a", "'air", "air", "airson", "'ar", "agus", "am", "an", "aon", "as",
-            "bho", "bhon", "bho'n", "bith", "brì", "brith",
-            "chionn", "co-dhiù",
-            "fad", "far", "feadh", "fhad", "fiù",
-            "gair", "ge", "ged", "gu", "gus", "is", "leis", "linn",
-            "ma", "man", "mar", "mara", "mas", "mu", "mun", "mur", "mura", "mus",
-            "nuair", "'nuair", "ò", "o", "o'n", "on", "ri", "sailleadh", "seach", "sgàth",
-            "theagamh", "uair"
-        ]
-    }
-    
-    if node.misc["ModernLemma"] != "":
-        lemma = node.misc["ModernLemma"]
-    elif node.misc["CorrectLemma"] != "":
-        lemma = node.misc["CorrectLemma"]
-    else:
-        lemma = node.lemma
-    if "Foreign" not in node.feats and node.xpos != "Xsi" and lemma not in allowed[node.upos]:
+    lemma = views.lemma[node.ord]
+    if "Foreign" not in node.feats and node.xpos != "Xsi" and lemma not in closed_class_lemmata[node.upos]:
         errors += 1
-        print(f"E {node.address()} '{lemma}' not allowed for {node.upos} ({node.xpos})")
+        report("check_closed_classes", f"E {node.address()} '{lemma}' not allowed for {node.upos} ({node.xpos})", node)
     return errors
 
 def check_csubj(node) -> int:
@@ -159,7 +226,7 @@ def check_csubj(node) -> int:
     allowed_deprels = ["csubj:cleft", "csubj:cop", "nsubj"]
     child_deprels = [c.deprel for c in node.children]
     if "cop" in child_deprels:
-        print("{node.address() check this {child_deprels}")
+        report("check_csubj", "{node.address() check this {child_deprels}")
     return errors
 
 def check_feats_column(node) -> int:
@@ -177,30 +244,39 @@ def check_feats_column(node) -> int:
     if node.deprel == "fixed" and node.prev_node.deprel != "fixed":
         if "ExtPos" not in node.prev_node.feats:
             errors += 1
-            print(f"E {node.prev_node.address()} head of fixed should have ExtPos feature")
+            fix = None
+            # A fixed node at the start of the sentence follows the technical root, which is never written out.
+            if not node.prev_node.is_root():
+                fix = Fix(f"ExtPos={node.prev_node.upos}", [(node.prev_node, "feats", "ExtPos", node.prev_node.upos)])
+            report("check_feats_column", f"E {node.prev_node.address()} head of fixed should have ExtPos feature",
+                   node.prev_node, fix)
     if "AdvType" in node.feats:
         if node.feats["AdvType"] not in allowed_advtypes:
             errors += 1
-            print(f"E {node.address()} Unrecognised AdvType {node.feats['AdvType']}")
+            report("check_feats_column", f"E {node.address()} Unrecognised AdvType {node.feats['AdvType']}", node)
     if node.upos == "PROPN" and "NounType" not in node.feats:
             errors += 1
-            print(f"E {node.address()} NounType must be in FEATS for PROPN '{node.form}'")
+            report("check_feats_column", f"E {node.address()} NounType must be in FEATS for PROPN '{node.form}'", node)
     if "NounType" in node.feats:
         if node.feats["NounType"] not in allowed_nountypes:
             errors += 1
-            print(f"E {node.address()} Unrecognised NounType {node.feats['NounType']}")
+            report("check_feats_column", f"E {node.address()} Unrecognised NounType {node.feats['NounType']}", node)
     return errors
 
-def read_fixed():
+def read_fixed(filename=None):
     """
     Returns a dictionary of lemmata keyed by surface.
     The lemmata are n - 1 and the surface is n.
+
+    By default fixed.gd is read from the directory this script is in, so it works from anywhere.
     """
 
+    if filename is None:
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixed.gd")
     allowed = {}
-    with open("fixed.gd") as fixed:
+    with open(filename) as fixed:
         for phrase in fixed:
-            words = phrase.split()
+            words = [sys.intern(w) for w in phrase.split()]
             if len(words) > 3:
                 if words[3] in allowed:
                     allowed[words[3]].append(words[2])
@@ -217,31 +293,36 @@ def read_fixed():
                 allowed[words[1]] = [words[0]]
     return allowed
 
-def check_fixed_expressions(node, allowed_fixed) -> int:
+def check_fixed_expressions(node, allowed_fixed, views) -> int:
     """
     Checks words linked by `fixed` against the list read in in read_fixed().
 
     Prints errors and returns the error count.
     """
     errors = 0
-    norm_node_form = node.form.lower().replace("‘", "'").replace("’", "'")
-    if node.misc["CorrectForm"] != "":
-        norm_node_form = node.misc["CorrectForm"]
-    elif node.misc["ModernForm"] != "":
-        norm_node_form = node.misc["ModernForm"]
-    norm_prev_node_form = node.prev_node.form.lower().replace("‘", "'").replace("’", "'")
-    if node.prev_node.misc["CorrectForm"] != "":
-        norm_prev_node_form = node.prev_node.misc["CorrectForm"]
-    elif node.prev_node.misc["ModernForm"] != "":
-        norm_prev_node_form = node.prev_node.misc["ModernForm"]
+    norm_node_form = views.form[node.ord]
+    norm_prev_node_form = views.form[node.ord - 1]
     if norm_node_form not in allowed_fixed:
         errors +=1
-        print(f"E {node.address()} '{node.form}' not in fixed list")
+        report("check_fixed_expressions", f"E {node.address()} '{node.form}' not in fixed list", node)
     elif norm_prev_node_form not in allowed_fixed[norm_node_form]:
         errors +=1
-        print(f"E {node.address()} '{norm_prev_node_form} {norm_node_form}' not in fixed list")
+        report("check_fixed_expressions", f"E {node.address()} '{norm_prev_node_form} {norm_node_form}' not in fixed list",
+               node, phrases=[f"{norm_prev_node_form} {norm_node_form}"])
     return errors
 
+def expected_flattype(node):
+    """
+    Returns the FlatType a flat node should have, Top for place names, or None if it cannot be told from the node.
+    """
+    if node.deprel == "flat:name":
+        if node.xpos == "Nt" or node.feats["NounType"] == "Top":
+            return "Top"
+        return "Name"
+    if node.deprel == "flat:foreign":
+        return "Foreign"
+    return None
+
 def check_misc_column(node) -> int:
     """
     Checks the MISC column for ARCOSG-specific features and Scottish Gaelic-specific features.
@@ -252,20 +333,25 @@ def check_misc_column(node) -> int:
     allowed_flattypes = ["Borrow", "Date", "Top", "Num", "Redup", "Name", "Foreign", "Time"]
     if node.lemma in ["[Name]", "[Placename]"] and "Anonymised" not in node.misc:
         errors += 1
-        print(f"E {node.address()} Anonymised=Yes missing from MISC column")
+        report("check_misc_column", f"E {node.address()} Anonymised=Yes missing from MISC column", node,
+               Fix("Anonymised=Yes", [(node, "misc", "Anonymised", "Yes")]))
     if node.udeprel == "flat" and "FlatType" not in node.misc:
         errors += 1
-        print(f"E {node.address()} FlatType required for flat:* deprel")
+        fix = None
+        flattype = expected_flattype(node)
+        if flattype is not None:
+            fix = Fix(f"FlatType={flattype}", [(node, "misc", "FlatType", flattype)])
+        report("check_misc_column", f"E {node.address()} FlatType required for flat:* deprel", node, fix)
     if "FlatType" in node.misc:
         if node.udeprel != "flat":
             errors += 1
-            print(f"E {node.address()} FlatType not allowed for non-flat deprel")
+            report("check_misc_column", f"E {node.address()} FlatType not allowed for non-flat deprel", node)
         if node.misc["FlatType"] not in allowed_flattypes:
             errors += 1
-            print(f"E {node.address()} Unrecognised FlatType {node.misc['FlatType']}")
+            report("check_misc_column", f"E {node.address()} Unrecognised FlatType {node.misc['FlatType']}", node)
     return errors
 
-def check_others(sentence) -> int:
+def check_others(node) -> int:
     """
     Checks for things that don't fit in anywhere else.
 
@@ -277,19 +363,19 @@ def check_others(sentence) -> int:
     errors = 0
     if node.form == "ais" and node.upos != "NOUN":
         errors +=1
-        print(f"E {node.address()} UPOS for 'ais' should be NOUN")    
+        report("check_others", f"E {node.address()} UPOS for 'ais' should be NOUN", node)
     if node.xpos == node.upos and node.feats == {}:
         errors +=1
-        print(f"E {node.address()} XPOS {node.xpos} should not match UPOS if feats is empty")
+        report("check_others", f"E {node.address()} XPOS {node.xpos} should not match UPOS if feats is empty", node)
     if node.xpos == "Up" and node.deprel != "flat:name" and node.prev_node.xpos == "Nn":
         errors += 1
-        print(f"E {node.address()} Patronymic should be flat:name")
+        report("check_others", f"E {node.address()} Patronymic should be flat:name", node)
     if node.deprel is None:
         errors += 1
-        print(f"E {node.address()} deprel must not be None")
+        report("check_others", f"E {node.address()} deprel must not be None", node)
     elif node.udeprel == "mark" and node.upos not in ["PART", "SCONJ"]:
         errors += 1
-        print(f"E {node.address()} mark should only be for PART or SCONJ")
+        report("check_others", f"E {node.address()} mark should only be for PART or SCONJ", node)
     return errors
 
 def check_proper_names(sentence) -> (int, int):
@@ -309,16 +395,16 @@ def check_proper_names(sentence) -> (int, int):
     if node.deprel == "flat:name":
         if node.form.lower() in surfaces or node.lemma.lower() in topo_surfaces:
             errors += 1
-            print(f"E {node.address()} deprel should reflect the grammar")
+            report("check_proper_names", f"E {node.address()} deprel should reflect the grammar", node)
     if node.upos == "PROPN" and word.form.lower() in patro_surfaces:
         errors += 1
-        print(f"E {node.address()} UPOS should be PART")
+        report("check_proper_names", f"E {node.address()} UPOS should be PART", node)
     if node.upos == "PROPN" and node.prev_node.upos == "DET" and node.deprel == "flat:name":
         warnings +=1
-        print(f"W {node.address()} consider nmod")
+        report("check_proper_names", f"W {node.address()} consider nmod", node)
     if node.upos == "PROPN" and node.feats["Case"] == "Gen" and node.deprel == "flat:name":
         warnings +=1
-        print(f"W {node.address()} consider nmod")
+        report("check_proper_names", f"W {node.address()} consider nmod", node)
     return errors, warnings
 
 def check_oblique_marking(node) -> int:
@@ -334,17 +420,19 @@ def check_oblique_marking(node) -> int:
     errors = 0
     if node.deprel in ["obl:smod", "obl:tmod"]:
         errors += 1
-        print(f"E {node.address()} {node.deprel}: this deprel is obsolete")
+        report("check_oblique_marking", f"E {node.address()} {node.deprel}: this deprel is obsolete", node)
     if node.deprel in ["nmod", "obl"] and "Promoted" not in node.misc:
         child_deprels = [c.deprel for c in node.children]
         if "case" not in child_deprels and node.feats["Case"] not in ["Dat", "Gen"]:
             errors += 1
-            print(f"E {node.address()} UNMARKED '{node.form}' should be {node.udeprel}:unmarked")
+            report("check_oblique_marking",
+                   f"E {node.address()} UNMARKED '{node.form}' should be {node.udeprel}:unmarked", node,
+                   Fix(f"deprel {node.udeprel}:unmarked", [(node, "deprel", None, f"{node.udeprel}:unmarked")]))
     if node.deprel in ["nmod:unmarked", "obl:unmarked"]:
         child_deprels = [c.deprel for c in node.children]
         if "case" in child_deprels and node.feats["Case"] in ["Dat", "Gen"]:
             errors += 1
-            print(f"E {node.address()} MARKED {node.udeprel} should not be tagged unmarked")
+            report("check_oblique_marking", f"E {node.address()} MARKED {node.udeprel} should not be tagged unmarked", node)
     return errors
 
 
@@ -365,14 +453,14 @@ def check_ranges(node) -> (int, int):
     warnings = 0
     if node.deprel in leftward_only and node.parent > node:
         warnings += 1
-        print(f"W {node.address()} {node.deprel} goes wrong way (usually) for gd")
+        report("check_ranges", f"W {node.address()} {node.deprel} goes wrong way (usually) for gd", node)
     elif node.deprel in rightward_only and node.parent < node:
         errors += 1
-        print(f"E {node.address()} {node.deprel} goes wrong way for gd")
+        report("check_ranges", f"E {node.address()} {node.deprel} goes wrong way for gd", node)
     elif node.deprel == "nummod" and node.parent < node:
         if node.parent.upos != "SYM" and node.prev_node.xpos != "Uo":
             errors += 1
-            print(f"E {node.address()} nummod goes wrong way for gd")
+            report("check_ranges", f"E {node.address()} nummod goes wrong way for gd", node)
     if node.deprel in short_range:
         range = abs(node.ord - node.parent.ord)
         if range > short_range[node.deprel]:
@@ -382,7 +470,7 @@ def check_ranges(node) -> (int, int):
             else:
                 errors += 1
                 code = "E"
-            print(f"{code} {node.address()} Too long a range ({range}) for {node.deprel}")
+            report("check_ranges", f"{code} {node.address()} Too long a range ({range}) for {node.deprel}", node)
     if node.deprel in ["nsubj", "obj"] and\
            node.upos not in ["NOUN", "PART", "PRON", "PROPN", "NUM", "SYM", "X"] and\
            node.parent < node:
@@ -390,7 +478,7 @@ def check_ranges(node) -> (int, int):
                 pass
             else:
                 errors +=1
-                print(f"E {node.address()} nsubj and (rightward) obj should only be for NOUN, PART, PRON, PROPN, NUM, SYM or X")
+                report("check_ranges", f"E {node.address()} nsubj and (rightward) obj should only be for NOUN, PART, PRON, PROPN, NUM, SYM or X", node)
     return errors, warnings
 
 def check_parent_upos(node) -> int:
@@ -412,7 +500,7 @@ def check_parent_upos(node) -> int:
     if node.deprel in allowed_parent_upos and "VerbForm" not in node.parent.feats:
         if node.parent.upos not in allowed_parent_upos[node.deprel]:
             errors += 1
-            print(f"E {node.parent.address()} parent of '{node.form}' ({node.address()}/{node.deprel}) must be one of ({', '.join(allowed_parent_upos[node.deprel])}) not {node.parent.upos}")
+            report("check_parent_upos", f"E {node.parent.address()} parent of '{node.form}' ({node.address()}/{node.deprel}) must be one of ({', '.join(allowed_parent_upos[node.deprel])}) not {node.parent.upos}", node.parent)
     return errors
 
 
@@ -451,12 +539,12 @@ def check_reported_speech(root, speech_lemmata) -> int:
     if speech_blocks != [] and parataxes != []:
         if speech_blocks[0][0] < 2 and not root_in_quote:
             errors += 1
-            print(f"E {root.address()} root should be inside quote")
+            report("check_reported_speech", f"E {root.address()} root should be inside quote", root)
     if speech_blocks == [] or speech_blocks[0][0] > 2:
         for parataxis in parataxes:
             if parataxis.parent.lemma in speech_lemmata and parataxis.lemma != "arsa":
                 errors += 1
-                print(f"E {parataxis.address()} deprel should be ccomp")
+                report("check_reported_speech", f"E {parataxis.address()} deprel should be ccomp", parataxis)
     return errors
 
 def check_parent_deprel(node) -> int:
@@ -479,7 +567,7 @@ def check_parent_deprel(node) -> int:
         correct = [*allowed_parent_deprels[node.deprel], *generic_deprels]
         if node.parent.deprel not in correct:
             errors +=1
-            print(f"E {node.address()}-{node.parent.address()} deprel must be one of {correct} not {node.parent.deprel}")
+            report("check_parent_deprel", f"E {node.address()}-{node.parent.address()} deprel must be one of {correct} not {node.parent.deprel}", node)
     return errors
 
 def check_multiples(node) -> int:
@@ -493,37 +581,28 @@ def check_multiples(node) -> int:
         children = [c for c in node.children if c.deprel == singleton_deprel]
         if len(children) > 1:
             errors += 1
-            print(f"E {node.address()} too many {singleton_deprel} ({[c.ord for c in children]}) for '{node.form}'")
+            report("check_multiples", f"E {node.address()} too many {singleton_deprel} ({[c.ord for c in children]}) for '{node.form}'", node)
     return errors
 
-def check_mwes(node) -> int:
+mwes = word_set(["agam", "agat", "aige", "aice", "againn", "agaibh", "aca",
+                 "dhomh", "dhut", "dhi", "dhuinn", "dhaibh", "dhiubh",
+                 "leam", "leat", "leatha", "leotha", "rium", "riut", "rithe", "f'a", "fodha", "uam"])
+mwe_dubia = word_set(["ann", "leis", "ris"])
+mwe_dubia_exceptions = word_set(["am", "an", "a", "gach", "a-seo", "a-seothach", "a-sin", "a-sineach", "a-siud",
+                                 "na", "gu", "nach"])
+
+def check_mwes(node, views) -> int:
     """
     Checks for multiword tokens in the UD sense like leam and rium that should be broken up.
     """
     errors = 0
-    mwes = ["agam", "agat", "aige", "aice", "againn", "agaibh", "aca",
-            "dhomh", "dhut", "dhi", "dhuinn", "dhaibh", "dhiubh",
-            "leam", "leat", "leatha", "leotha", "rium", "riut", "rithe", "f'a", "fodha", "uam"]
-    dubia = ["ann", "leis", "ris"]
-    dubia_exceptions = ["am", "an", "a", "gach", "a-seo", "a-seothach", "a-sin", "a-sineach", "a-siud", "na", "gu", "nach"]
-    if node.misc["CorrectForm"] != "":
-        norm_node_form = node.misc["CorrectForm"]
-    elif node.misc["ModernForm"] != "":
-        norm_node_form = node.misc["ModernForm"]
-    else:
-        norm_node_form = node.form
+    norm_node_form = views.corrected_form[node.ord]
     if norm_node_form.lower() in mwes and node.upos == "ADP":
         errors += 1
-        print(f"E {node.address()} '{node.form}' is a MWE and should be split up")
-    if node.next_node is not None:
-        if node.next_node.misc["CorrectLemma"] != "":
-            norm_next_node_lemma = node.next_node.misc["CorrectLemma"]
-        elif node.next_node.misc["ModernLemma"] != "":
-            norm_next_node_lemma = node.next_node.misc["ModernLemma"]
-        else:
-            norm_next_node_lemma = node.next_node.lemma
-        if norm_node_form in dubia and norm_next_node_lemma not in dubia_exceptions:
-            print(f"? {node.address()} '{node.form}' is probably a MWE as the next token is '{node.next_node.form}' (lemma '{node.next_node.lemma}')")
+        report("check_mwes", f"E {node.address()} '{node.form}' is a MWE and should be split up", node)
+    if norm_node_form in mwe_dubia and node.ord + 1 < len(views.lemma):
+        if views.lemma[node.ord + 1] not in mwe_dubia_exceptions:
+            report("check_mwes", f"? {node.address()} '{node.form}' is probably a MWE as the next token is '{node.next_node.form}' (lemma '{node.next_node.lemma}')", node)
     return errors
 
 def check_relatives(node) -> int:
@@ -537,13 +616,13 @@ def check_relatives(node) -> int:
     message_stub = f"{node.address()} deprel for '{node.form}'"
     if node.prev_node.upos == "ADP":
         errors += 1
-        print(f"E {message_stub} should be obl:unmarked, nmod:unmarked or xcomp:pred")
+        report("check_relatives", f"E {message_stub} should be obl:unmarked, nmod:unmarked or xcomp:pred", node)
     elif node.prev_node.lemma in ["carson", "ciamar", "cuine", "cuin'"]:
         errors += 1
-        print(f"E {message_stub} should be advmod or xcomp:pred")
+        report("check_relatives", f"E {message_stub} should be advmod or xcomp:pred", node)
     elif node.prev_node.upos not in ["CCONJ", "SCONJ"] and not node.prev_node.is_root():
         errors += 1
-        print(f"E {message_stub} should usually be nsubj or obj")
+        report("check_relatives", f"E {message_stub} should usually be nsubj or obj", node)
     return errors
 
 def check_child_upos(node) -> int:
@@ -573,7 +652,7 @@ def check_child_upos(node) -> int:
         if child.upos not in allowed_upos[child.deprel]:
             if extpos is None or extpos not in allowed_upos[child.deprel]:
                 errors += 1
-                print(f"E {child.address()} '{child.lemma}': {child.upos} should be one of {allowed_upos[child.deprel]}")
+                report("check_child_upos", f"E {child.address()} '{child.lemma}': {child.upos} should be one of {allowed_upos[child.deprel]}", child)
     return errors
 
 def possible_predicate(node) -> bool:
@@ -624,9 +703,26 @@ def check_passive(node) -> int:
                 rach_aig = True
         if not rach_aig and not spatial:
             errors += 1
-            print(f"E {node.address()} should not be the head in this passive construction. Suggest {xcomp.address()}")
+            report("check_passive",
+                   f"E {node.address()} should not be the head in this passive construction. Suggest {xcomp.address()}",
+                   node, passive_fix(node, xcomp))
     return errors
 
+def passive_fix(rach, infinitive) -> Fix:
+    """
+    Returns the Fix that makes the infinitive the head and rach its aux:pass.
+
+    The other dependents of rach move to the infinitive, with nsubj becoming nsubj:pass.
+    """
+    changes = [(infinitive, "parent", None, rach.parent), (infinitive, "deprel", None, rach.deprel)]
+    for child in rach.children:
+        if child is not infinitive:
+            changes.append((child, "parent", None, infinitive))
+            if child.deprel == "nsubj":
+                changes.append((child, "deprel", None, "nsubj:pass"))
+    changes += [(rach, "parent", None, infinitive), (rach, "deprel", None, "aux:pass")]
+    return Fix(f"{infinitive.address()} head with aux:pass", changes)
+
 def check_passive_agent(node) -> int:
     """
     Checks infinitives for (a) being passive and (b) having candidates for obl:agent.
@@ -637,18 +733,22 @@ def check_passive_agent(node) -> int:
         for oblique in [c for c in node.children if c.deprel == "obl"]:
             adps = [a for a in oblique.children if a.deprel == "case"]
             for adp in [l for l in adps if l.lemma == "le"]:
-                print(f"? {adp.parent.address()} consider obl:agent")
+                report("check_passive_agent", f"? {adp.parent.address()} consider obl:agent", adp.parent)
     return 0
 
-allowed_fixed = read_fixed()
 speech_lemmata = ["abair", "aidich", "bruidhinn", "cabadaich", "can", "èigh", "faighnich",
                       "foighneach", "freagair", "inns"]
-total_errors = 0
-total_warnings = 0
-document = Document(filename = sys.argv[1])
-for b in document.bundles:
-    root = b.get_tree()
+
+def validate_tree(root, allowed_fixed, speech_lemmata) -> (int, int):
+    """
+    Runs all the checks over one sentence.
+
+    Returns a tuple of the errors found and warnings found.
+    """
+    total_errors = 0
+    total_warnings = 0
     nodes = root.descendants
+    views = SentenceViews(root)
     total_errors = total_errors + check_reported_speech(root, speech_lemmata)
     for node in nodes:
         errors, warnings = check_ranges(node)
@@ -656,7 +756,7 @@ for b in document.bundles:
         total_warnings = total_warnings + warnings
         total_errors = total_errors + check_feats_column(node)
         total_errors = total_errors + check_misc_column(node)
-        total_errors = total_errors + check_mwes(node)
+        total_errors = total_errors + check_mwes(node, views)
         total_errors = total_errors + check_others(node)
         if not node.is_root():
             total_errors = total_errors + check_parent_deprel(node)
@@ -668,13 +768,13 @@ for b in document.bundles:
             total_errors = total_errors + check_cleft(node)
             total_errors = total_errors + check_multiples(node)
         if node.upos in ["ADP", "CCONJ", "DET", "PRON", "SCONJ"]:
-            total_errors = total_errors + check_closed_classes(node)
+            total_errors = total_errors + check_closed_classes(node, views)
         if node.deprel in ["acl:relcl", "advcl", "advcl:relcl", "ccomp"]:
             errors, warnings = check_clause_types(node, speech_lemmata)
             total_errors = total_errors + errors
             total_warnings = total_warnings + warnings
         if node.deprel == "fixed":
-            total_errors = total_errors + check_fixed_expressions(node, allowed_fixed)
+            total_errors = total_errors + check_fixed_expressions(node, allowed_fixed, views)
         if node.udeprel in ["nmod", "obl"]:
             total_errors = total_errors + check_oblique_marking(node)
         if node.lemma == "rach" and node.upos == "VERB":
@@ -683,12 +783,60 @@ for b in document.bundles:
             total_errors = total_errors + check_passive_agent(node)
         if node.xpos in ["Q-r", "Qnr"] and node.deprel == "mark:prt":
             total_errors = total_errors + check_relatives(node)
+    return total_errors, total_warnings
 
-if total_errors == 0:
-    if total_warnings == 0:
-        print("*** PASSED ***")
+def validate_trees(trees, allowed_fixed=None) -> (int, int):
+    """
+    Runs all the checks over each udapi tree from an iterable.
+
+    Returns a tuple of the errors found and warnings found.
+    """
+    if allowed_fixed is None:
+        allowed_fixed = read_fixed()
+    total_errors = 0
+    total_warnings = 0
+    for root in trees:
+        errors, warnings = validate_tree(root, allowed_fixed, speech_lemmata)
+        total_errors = total_errors + errors
+        total_warnings = total_warnings + warnings
+    return total_errors, total_warnings
+
+def print_verdict(total_errors, total_warnings):
+    if total_errors == 0:
+        if total_warnings == 0:
+            print("*** PASSED ***")
+        else:
+            print(f"*** PASSED *** with {total_warnings} warnings")
+    else:
+        print(f"*** FAILED *** with {total_errors} error{'s' if total_errors != 1 else ''} and {total_warnings} warning{'s' if total_warnings != 1 else ''}")
+
+def main(argv=None):
+    """
+    Validates the CoNLL-U file named in the first argument, which may be compressed.
+    It is read and parsed in a thread of its own while the sentences already read are checked.
+
+    Returns 0 if it passed and 1 if it failed.
+    """
+    import argparse
+    from pipeline import read_trees
+    parser = argparse.ArgumentParser(description="Checks for things the standard UD validation tools do not cover.")
+    parser.add_argument("file", help="CoNLL-U file")
+    parser.add_argument("--summary", action="store_true",
+                        help="print a summary by check and message instead of every finding")
+    parser.add_argument("--buckets", type=int, default=200, help="most messages kept in the summary")
+    parser.add_argument("--samples", type=int, default=5, help="sent_ids and top values shown per message")
+    args = parser.parse_args(argv)
+    trees = read_trees(args.file)
+    if args.summary:
+        import aggregate
+        aggregator = aggregate.Aggregator(buckets=args.buckets, top=args.samples, samples=args.samples)
+        aggregate.summarise_trees(trees, read_fixed(), aggregator)
+        print(aggregator.report())
+        total_errors, total_warnings = aggregator.total_errors, aggregator.total_warnings
     else:
-        print(f"*** PASSED *** with {total_warnings} warnings")
-else:
-    print(f"*** FAILED *** with {total_errors} error{'s' if total_errors != 1 else ''} and {total_warnings} warning{'s' if total_warnings != 1 else ''}")
+        total_errors, total_warnings = validate_trees(trees)
+    print_verdict(total_errors, total_warnings)
+    return 0 if total_errors == 0 else 1
 
+if __name__ == "__main__":
+    sys.exit(main())
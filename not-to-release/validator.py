@@ -0,0 +1,119 @@
+"""
+Library interface to the checks in validate_gd_extras.py, for filtering parser output without files.
+
+    from validator import Validator
+    validator = Validator()
+    for result in validator.validate(sentences):
+        if result.passed:
+            ...
+
+A sentence is either a CoNLL-U string (comments and token lines) or a sequence of ten-column token tuples.
+Each result has the sent_id, a pass/fail verdict, the error and warning counts and the diagnostic lines
+that validate_gd_extras.py would have printed.
+Nothing is printed and nothing is read or written apart from fixed.gd, once, when the Validator is made.
+
+A Validator can be shared between threads: the word lists are only read, diagnostics are collected per
+thread and each thread gets its own CoNLL-U reader.
+validate_batch() spreads the work over a thread or process pool and returns results in input order.
+The checks are pure Python, so it is the process pool that uses more than one core.
+"""
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from validate_gd_extras import collecting, read_fixed, speech_lemmata, validate_tree
+
+Result = namedtuple("Result", ["sent_id", "passed", "errors", "warnings", "diagnostics"])
+
+class Validator:
+    """
+    Validates sentences one at a time or in batches, reusing the word lists across calls.
+    """
+    def __init__(self, allowed_fixed=None):
+        self.allowed_fixed = allowed_fixed if allowed_fixed is not None else read_fixed()
+        self._local = threading.local()
+
+    def _reader(self):
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            import io
+            from udapi.block.read.conllu import Conllu
+            reader = self._local.reader = Conllu(filehandle=io.StringIO(""), empty_parent="ignore")
+        return reader
+
+    def parse(self, sentence):
+        """
+        Returns the udapi tree for a CoNLL-U string or a sequence of token tuples.
+
+        Raises ValueError if there are no tokens.
+        """
+        if isinstance(sentence, str):
+            lines = [line for line in sentence.split("\n") if line.strip() != ""]
+        else:
+            lines = ["\t".join("_" if value is None else str(value) for value in token) for token in sentence]
+        root = self._reader().read_tree_from_lines(lines) if lines else None
+        if root is None:
+            raise ValueError("sentence has no tokens")
+        return root
+
+    def validate_tree(self, root) -> Result:
+        """
+        Runs the checks over a udapi tree.
+        """
+        with collecting() as diagnostics:
+            errors, warnings = validate_tree(root, self.allowed_fixed, speech_lemmata)
+        return Result(root.sent_id, errors == 0, errors, warnings, [d.line for d in diagnostics])
+
+    def validate_sentence(self, sentence) -> Result:
+        """
+        Runs the checks over a CoNLL-U string or a sequence of token tuples.
+        """
+        return self.validate_tree(self.parse(sentence))
+
+    def validate(self, sentences):
+        """
+        Yields a Result for each sentence in an iterable, in the same thread.
+        """
+        for sentence in sentences:
+            yield self.validate_sentence(sentence)
+
+    def validate_batch(self, sentences, workers=4, processes=False, chunk_size=256):
+        """
+        Yields a Result for each sentence in an iterable, in order, using a pool of workers.
+
+        Sentences are sent to the pool in chunks of chunk_size and at most two chunks per worker
+        are in flight, so an unbounded iterator does not get read into memory.
+        With processes=True the fixed expressions already read are sent to each worker process once,
+        when it starts, and it keeps its own Validator; no worker reads fixed.gd.
+        """
+        if processes:
+            executor = ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(self.allowed_fixed,))
+            work = _validate_chunk
+        else:
+            executor = ThreadPoolExecutor(workers)
+            work = self._validate_chunk
+        with executor:
+            sentences = iter(sentences)
+            pending = []
+            while True:
+                while len(pending) < 2 * workers:
+                    chunk = list(islice(sentences, chunk_size))
+                    if chunk == []:
+                        break
+                    pending.append(executor.submit(work, chunk))
+                if pending == []:
+                    return
+                yield from pending.pop(0).result()
+
+    def _validate_chunk(self, chunk) -> list:
+        return [self.validate_sentence(sentence) for sentence in chunk]
+
+_worker_validator = None
+
+def _start_worker(allowed_fixed):
+    global _worker_validator
+    _worker_validator = Validator(allowed_fixed)
+
+def _validate_chunk(chunk) -> list:
+    return _worker_validator._validate_chunk(chunk)